@@ -148,13 +148,17 @@ def type_checker(
     return result
 
 
+# Translation table used by `standardize_string`: deletes the spaces and ",./-_*^" punctuation.
+STANDARDIZE_STRING_TABLE = str.maketrans("", "", " ,./-_*^")
+
+
 def standardize_string(input_string: str):
     # This function standardizes the string by removing all the spaces, ",./-_*^" punctuation, and converting it to lowercase
     # It will also convert all the single quotes to double quotes
     # This is used to compare the model output with the possible answers
     # We don't want to punish model for answer like April 1, 2024 vs April 1,2024, vs April 1 2024
-    regex_string = r"[ \,\.\/\-\_\*\^]"
-    return re.sub(regex_string, "", input_string).lower().replace("'", '"')
+    # The quotes are converted after `lower()`, since a single quote affects how `lower()` maps a final capital sigma.
+    return input_string.translate(STANDARDIZE_STRING_TABLE).lower().replace("'", '"')
 
 
 def string_checker(param: str, model_output: str, possible_answer: list):
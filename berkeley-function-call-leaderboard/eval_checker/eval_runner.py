@@ -330,7 +330,7 @@ def runner(model_names, test_categories, api_sanity_check):
 
             print(f"🔍 Running test: {test_category}")
 
-            model_result = load_file(model_result_json)
+            model_result = load_result_file(model_result_json)
             record_cost_latency(LEADERBOARD_TABLE, model_name, model_result)
 
             if is_relevance(test_category):
@@ -5,6 +5,7 @@ import statistics
 import subprocess
 
 import numpy as np
+import orjson
 from custom_exception import BadAPIStatusError
 from model_handler.handler_map import handler_map
 from tqdm import tqdm
@@ -498,12 +499,15 @@ def is_sql(test_category):
 
 
 def load_file(file_path):
-    result = []
+    # The whole file is read at once and each line is parsed by orjson, which is much faster than the json module on these files.
+    with open(file_path, "rb") as f:
+        return [orjson.loads(line) for line in f.read().splitlines() if line]
+
+
+def load_result_file(file_path):
+    # Model results can hold integers beyond 64 bits and NaN, which orjson cannot round-trip, so they are parsed by the json module.
     with open(file_path) as f:
-        file = f.readlines()
-        for line in file:
-            result.append(json.loads(line))
-    return result
+        return [json.loads(line) for line in f if line.strip()]
 
 
 def get_handler(model_name):
@@ -914,7 +918,7 @@ def update_leaderboard_table_with_score_file(leaderboard_table, score_path):
         model_name = subdir.split(score_path)[1]
         # Find and process all JSON files in the subdirectory
         for model_score_json in glob.glob(json_files_pattern):
-            metadata = load_file(model_score_json)[0]
+            metadata = load_result_file(model_score_json)[0]
             accuracy, total_count = metadata["accuracy"], metadata["total_count"]
             test_category = model_score_json.split("_score.json")[0].split("/")[-1]
             if model_name not in leaderboard_table:
@@ -927,7 +931,7 @@ def update_leaderboard_table_with_score_file(leaderboard_table, score_path):
 
 
 def oss_file_formatter(input_file_path, output_dir):
-    data = load_file(input_file_path)
+    data = load_result_file(input_file_path)
     assert len(data) == 2000, "OSS result.json file should have 2000 entries."
 
     for key, value in FILENAME_INDEX_MAPPING.items():
@@ -1,6 +1,7 @@
 from model_handler.handler import BaseHandler
 from model_handler.model_style import ModelStyle
 from model_handler.utils import (
+    functions_cache_key,
     convert_to_tool,
     ast_parse,
     augment_prompt_by_languge,
@@ -17,6 +18,9 @@ from model_handler.constant import (
 import os, time
 from anthropic import Anthropic
 
+# Converted tools and the system prompt built from them, so that each distinct tool set is converted and rendered only once.
+_SYSTEM_PROMPT_CACHE = {}
+
 
 class ClaudePromptingHandler(BaseHandler):
     def __init__(self, model_name, temperature=0.7, top_p=1, max_tokens=1000) -> None:
@@ -25,11 +29,21 @@ class ClaudePromptingHandler(BaseHandler):
 
         self.client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
+    def _get_tools_and_system_prompt(self, functions, test_category):
+        key = (functions_cache_key(functions), test_category, self.model_style)
+        cached = _SYSTEM_PROMPT_CACHE.get(key)
+        if cached is None:
+            input_tool = convert_to_tool(
+                functions, GORILLA_TO_PYTHON, self.model_style, test_category, True
+            )
+            cached = (input_tool, construct_tool_use_system_prompt(input_tool))
+            _SYSTEM_PROMPT_CACHE[key] = cached
+        return cached
+
     def _get_claude_function_calling_response(self, prompt, functions, test_category):
-        input_tool = convert_to_tool(
-            functions, GORILLA_TO_PYTHON, self.model_style, test_category, True
+        input_tool, system_prompt = self._get_tools_and_system_prompt(
+            functions, test_category
         )
-        system_prompt = construct_tool_use_system_prompt(input_tool)
         start = time.time()
         response = self.client.messages.create(
             model=self.model_name.strip("-FC"),
@@ -41,16 +55,13 @@ class ClaudePromptingHandler(BaseHandler):
         )
         latency = time.time() - start
         result = []
-        if (
-            "invokes"
-            not in _function_calls_valid_format_and_invoke_extraction(
-                response.content[0].text
-            ).keys()
-        ):
-            return "Error", {"input_tokens": 0, "output_tokens": 0, "latency": latency}
-        for invoked_function in _function_calls_valid_format_and_invoke_extraction(
+        # The completion is parsed once, both to validate it and to extract the calls.
+        function_calls = _function_calls_valid_format_and_invoke_extraction(
             response.content[0].text
-        )["invokes"]:
+        )
+        if "invokes" not in function_calls:
+            return "Error", {"input_tokens": 0, "output_tokens": 0, "latency": latency}
+        for invoked_function in function_calls["invokes"]:
             name = invoked_function["tool_name"]
             select_func = None
             for func in input_tool:
@@ -12,6 +12,16 @@ USER_PROMPT_FOR_CHAT_MODEL = """
     Should you decide to return the function call(s),Put it in the format of [func1(params_name=params_value, params_name2=params_value2...), func2(params)]\n
     NO other text MUST be included. 
 """
+
+USER_PROMPT_FOR_BATCHED_EXAMPLE = """
+    Questions:{user_prompt}\nHere is a list of functions in JSON format that you can invoke:\n{functions}.
+"""
+
+USER_PROMPT_FOR_BATCHED_CHAT_MODEL = """
+    Each of the {num_examples} examples above is an independent question with its own list of functions. Answer every example on its own, following its instructions.
+    Return a JSON array of {num_examples} strings, one per example in order, where each string is the function call(s) for that example in the format of [func1(params_name=params_value, params_name2=params_value2...), func2(params)].
+    NO other text MUST be included.
+"""
 GORILLA_TO_OPENAPI = {
     "integer": "integer",
     "number": "number",
@@ -10,6 +10,9 @@ import time
 from openai import OpenAI
 import re
 
+# Strips the quotes around single-quoted strings in the model output.
+QUOTED_STRING_REGEX = re.compile(r"'([^']*)'")
+
 
 class DatabricksHandler(BaseHandler):
     def __init__(self, model_name, temperature=0.7, top_p=1, max_tokens=1000) -> None:
@@ -56,7 +59,7 @@ class DatabricksHandler(BaseHandler):
         return result, metadata
 
     def decode_ast(self, result, language="Python"):
-        func = re.sub(r"'([^']*)'", r"\1", result)
+        func = QUOTED_STRING_REGEX.sub(r"\1", result)
         func = func.replace("\n    ", "")
         if not func.startswith("["):
             func = "[" + func
@@ -71,7 +74,7 @@ class DatabricksHandler(BaseHandler):
         return decode_output
 
     def decode_execute(self, result, language="Python"):
-        func = re.sub(r"'([^']*)'", r"\1", result)
+        func = QUOTED_STRING_REGEX.sub(r"\1", result)
         func = func.replace("\n    ", "")
         if not func.startswith("["):
             func = "[" + func
@@ -2,6 +2,8 @@ from model_handler.oss_handler import OSSHandler
 from model_handler.utils import convert_to_function_call, ast_parse
 import re
 
+FUNCTION_CALL_LIST_REGEX = re.compile(r"\[[^\]]*\]")
+
 
 class DeepseekHandler(OSSHandler):
     def __init__(self, model_name, temperature=0.7, top_p=1, max_tokens=1000) -> None:
@@ -28,14 +30,14 @@ class DeepseekHandler(OSSHandler):
         )
 
     def decode_ast(self, result, language="Python"):
-        function_call = result.split("```")[1]
-        matches = re.findall(r"\[[^\]]*\]", function_call)
+        function_call = result.split("```", 2)[1]
+        matches = FUNCTION_CALL_LIST_REGEX.findall(function_call)
         decoded_output = ast_parse(matches[0], language)
         return decoded_output
 
     def decode_execute(self, result):
-        function_call = result.split("```")[1]
-        matches = re.findall(r"\[[^\]]*\]", function_call)
+        function_call = result.split("```", 2)[1]
+        matches = FUNCTION_CALL_LIST_REGEX.findall(function_call)
         decoded_output = ast_parse(matches[0])
         execution_list = []
         for function_call in decoded_output:
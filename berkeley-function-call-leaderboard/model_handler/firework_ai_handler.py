@@ -1,7 +1,6 @@
 from model_handler.gpt_handler import OpenAIHandler
 from model_handler.model_style import ModelStyle
-import os, json
-from openai import OpenAI
+import os
 
 
 class FireworkAIHandler(OpenAIHandler):
@@ -10,20 +9,13 @@ class FireworkAIHandler(OpenAIHandler):
         self.model_name = "accounts/fireworks/models/firefunction-v1-FC"
         self.model_style = ModelStyle.FIREWORK_AI
 
-        self.client = OpenAI(
+        self._init_clients(
             base_url="https://api.fireworks.ai/inference/v1",
             api_key=os.getenv("FIRE_WORKS_API_KEY"),
         )
 
-    def write(self, result, file_to_open):
-        # This method is used to write the result to the file.
-        if not os.path.exists("./result"):
-            os.mkdir("./result")
-        if not os.path.exists("./result/fire-function-v1-FC"):
-            os.mkdir("./result/fire-function-v1-FC")
-        with open(
+    def get_result_path(self, file_to_open):
+        return (
             "./result/fire-function-v1-FC/"
-            + file_to_open.replace(".json", "_result.json"),
-            "a+",
-        ) as f:
-            f.write(json.dumps(result) + "\n")
+            + file_to_open.replace(".json", "_result.json")
+        )
@@ -1,7 +1,5 @@
 from model_handler.gpt_handler import OpenAIHandler
 from model_handler.model_style import ModelStyle
-import os, json
-from openai import OpenAI
 
 # For setup instructions, please refer to https://github.com/MeetKai/functionary for setup details. 
 class FunctionaryHandler(OpenAIHandler):
@@ -12,15 +10,7 @@ class FunctionaryHandler(OpenAIHandler):
         self.model_name = model_name
         self.model_style = ModelStyle.OpenAI
 
-        self.client = OpenAI(base_url="http://localhost:8000/v1", api_key="functionary")
+        self._init_clients(base_url="http://localhost:8000/v1", api_key="functionary")
 
-    def write(self, result, file_to_open):
-        model_name = self.model_name
-        if not os.path.exists("./result"):
-            os.mkdir("./result")
-        if not os.path.exists("./result/" + model_name.replace("/", "_")):
-            os.mkdir("./result/" + model_name.replace("/", "_"))
-        with open(
-            "./result/" + model_name.replace("/", "_") + "/" + file_to_open, "a+"
-        ) as f:
-            f.write(json.dumps(result) + "\n")
+    def get_result_path(self, file_to_open):
+        return "./result/" + self.model_name.replace("/", "_") + "/" + file_to_open
@@ -7,26 +7,53 @@ from model_handler.utils import (
     language_specific_pre_processing,
 )
 from model_handler.constant import GORILLA_TO_OPENAPI
-import subprocess, requests, json, time
+import subprocess, requests, json, orjson, threading, time
+
+# gcloud access tokens are valid for an hour; a cached token is refreshed well before it expires.
+ACCESS_TOKEN_LIFETIME = 30 * 60
 
 
 class GeminiHandler(BaseHandler):
     def __init__(self, model_name, temperature=0.7, top_p=1, max_tokens=1000) -> None:
         super().__init__(model_name, temperature, top_p, max_tokens)
         self.model_style = ModelStyle.Google
+        self._access_token = None
+        self._access_token_time = 0
+        self._access_token_lock = threading.Lock()
+        # Reused by all requests, so that the connection to Vertex AI stays open.
+        self.session = requests.Session()
+
+    def close(self):
+        self.session.close()
+
+    def _get_access_token(self):
+        # This method returns the gcloud access token, running `gcloud` only when the cached token is missing or old.
+        with self._access_token_lock:
+            if (
+                self._access_token is None
+                or time.monotonic() - self._access_token_time > ACCESS_TOKEN_LIFETIME
+            ):
+                process = subprocess.run(
+                    "gcloud auth print-access-token",
+                    check=False,
+                    shell=True,
+                    capture_output=True,
+                    text=True,
+                )
+                token = process.stdout.strip()
+                # A failed `gcloud` call is not cached, so that the next request tries again.
+                if process.returncode != 0 or not token:
+                    return token
+                self._access_token = token
+                self._access_token_time = time.monotonic()
+            return self._access_token
 
     def _query_gemini(self, user_query, functions):
         """
         Query Gemini Pro model.
         """
 
-        token = subprocess.run(
-            "gcloud auth print-access-token",
-            check=False,
-            shell=True,
-            capture_output=True,
-            text=True,
-        ).stdout.strip()
+        token = self._get_access_token()
 
         json_data = {
             "contents": {
@@ -49,12 +76,13 @@ class GeminiHandler(BaseHandler):
             "Content-Type": "application/json",
         }
         start = time.time()
-        response = requests.post(
+        response = self.session.post(
             API_URL,
             headers=headers,
-            data=json.dumps(json_data),
+            data=orjson.dumps(json_data),
         )
         latency = time.time() - start
+        # The response body is parsed once and reused for the usage metadata below.
         result = json.loads(response.content)
         if "error" in result:
             return result["error"]["message"], {
@@ -75,15 +103,13 @@ class GeminiHandler(BaseHandler):
                         parts.append("Parsing error: " + json.dumps(part["functionCall"]))
                 else:
                     parts.append(part["text"])
-            result = parts
             metatdata = {}
-            metatdata["input_tokens"] = json.loads(response.content)["usageMetadata"][
-                "promptTokenCount"
-            ]
-            metatdata["output_tokens"] = json.loads(response.content)["usageMetadata"][
+            metatdata["input_tokens"] = result["usageMetadata"]["promptTokenCount"]
+            metatdata["output_tokens"] = result["usageMetadata"][
                 "candidatesTokenCount"
             ]
             metatdata["latency"] = latency
+            result = parts
         except Exception as e:
             result = "Parsing error: " + json.dumps(result)
             metatdata = {
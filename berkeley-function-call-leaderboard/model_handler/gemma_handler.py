@@ -2,6 +2,8 @@ from model_handler.oss_handler import OSSHandler
 from model_handler.utils import ast_parse
 import re
 
+FUNCTION_CALL_LIST_REGEX = re.compile(r"\[(.*)\]", re.DOTALL)
+
 
 class GemmaHandler(OSSHandler):
     def __init__(self, model_name, temperature=0.7, top_p=1, max_tokens=1000) -> None:
@@ -29,20 +31,16 @@ class GemmaHandler(OSSHandler):
         )
 
     def decode_ast(self, result, language="Python"):
-        pattern = r"\[(.*)\]"
-
         # Searching for the pattern in the input text
-        match = re.search(pattern, result, re.DOTALL)
+        match = FUNCTION_CALL_LIST_REGEX.search(result)
         raw_input = match.group(1)
         func = "[" + raw_input + "]"
         decoded_output = ast_parse(func, language=language)
         return decoded_output
 
     def decode_execute(self, result):
-        pattern = r"\[(.*)\]"
-
         # Searching for the pattern in the input text
-        match = re.search(pattern, result, re.DOTALL)
+        match = FUNCTION_CALL_LIST_REGEX.search(result)
         raw_input = match.group(1)
         func = "[" + raw_input + "]"
         decoded_output = ast_parse(func)
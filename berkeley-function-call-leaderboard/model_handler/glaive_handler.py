@@ -23,7 +23,7 @@ class GlaiveHandler(OSSHandler):
         )
 
     def decode_ast(self, result, language="Python"):
-        function_call = result.split("<functioncall>")[-1]
+        function_call = result.rpartition("<functioncall>")[2]
         function_call = function_call.replace("'", "")
         decoded_function = json.loads(function_call)
         for key, value in decoded_function["arguments"].items():
@@ -38,7 +38,7 @@ class GlaiveHandler(OSSHandler):
         return decoded_result
 
     def decode_execute(self, result):
-        function_call = result.split("<functioncall>")[-1]
+        function_call = result.rpartition("<functioncall>")[2]
         function_call = function_call.replace("'", "")
         decoded_function = json.loads(function_call)
         decoded_result = [{decoded_function["name"]: decoded_function["arguments"]}]
@@ -5,13 +5,17 @@ from model_handler.utils import (
     augment_prompt_by_languge,
     language_specific_pre_processing,
 )
-import requests, json, re, time
+import requests, orjson, re, time
 
 
 class GorillaHandler(BaseHandler):
     def __init__(self, model_name, temperature=0.7, top_p=1, max_tokens=1000) -> None:
         super().__init__(model_name, temperature, top_p, max_tokens)
         self.model_style = ModelStyle.Gorilla
+        self.session = requests.Session()
+
+    def close(self):
+        self.session.close()
 
     def _get_gorilla_response(self, prompt, functions):
         requestData = {
@@ -24,13 +28,13 @@ class GorillaHandler(BaseHandler):
         }
         url = "https://luigi.millennium.berkeley.edu:443/v1/chat/completions"
         start = time.time()
-        response = requests.post(
+        response = self.session.post(
             url,
             headers={
                 "Content-Type": "application/json",
                 "Authorization": "EMPTY",  # Hosted for free with ❤️ from UC Berkeley
             },
-            data=json.dumps(requestData),
+            data=orjson.dumps(requestData),
         )
         latency = time.time() - start
         jsonResponse = response.json()
@@ -1,6 +1,7 @@
 from model_handler.handler import BaseHandler
 from model_handler.model_style import ModelStyle
 from model_handler.utils import (
+    functions_cache_key,
     convert_to_tool,
     convert_to_function_call,
     augment_prompt_by_languge,
@@ -11,22 +12,116 @@ from model_handler.constant import (
     GORILLA_TO_OPENAPI,
     GORILLA_TO_PYTHON,
     USER_PROMPT_FOR_CHAT_MODEL,
+    USER_PROMPT_FOR_BATCHED_EXAMPLE,
+    USER_PROMPT_FOR_BATCHED_CHAT_MODEL,
     SYSTEM_PROMPT_FOR_CHAT_MODEL,
 )
-from openai import OpenAI
-import os, time, json
+from openai import OpenAI, AsyncOpenAI
+import asyncio, copy, functools, httpx, importlib.util, os, re, time, json
+
+# Connection pool size, which should be at least `--num-workers`.
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+HTTP_LIMITS = httpx.Limits(
+    max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS
+)
+
+# Use the aiohttp transport if the aiohttp extra of the OpenAI SDK is installed.
+if importlib.util.find_spec("httpx_aiohttp") is not None:
+    from openai import DefaultAioHttpClient as AsyncHttpClient
+else:
+    AsyncHttpClient = httpx.AsyncClient
+
+# Pre-processed functions and converted tools, shared by all handlers and never modified.
+_FUNCTIONS_CACHE = {}
+
+# Models often wrap the JSON array of a batched answer in a ```json code fence.
+_CODE_FENCE = re.compile(r"^```\w*\s*|\s*```$")
 
 
 class OpenAIHandler(BaseHandler):
     def __init__(self, model_name, temperature=0.7, top_p=1, max_tokens=1000) -> None:
         super().__init__(model_name, temperature, top_p, max_tokens)
         self.model_style = ModelStyle.OpenAI
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self._init_clients(api_key=os.getenv("OPENAI_API_KEY"))
 
-    def inference(self, prompt,functions,test_category):
+    def _init_clients(self, api_key, base_url=None):
+        # The SDK's own retries are disabled, since the caller retries transient failures.
+        self.client = OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=httpx.Client(limits=HTTP_LIMITS),
+            max_retries=0,
+        )
+        self._api_key = api_key
+        self._base_url = base_url
+
+    @functools.cached_property
+    def async_client(self):
+        # Created on first use, so that it is bound to the running event loop.
+        return AsyncOpenAI(
+            api_key=self._api_key,
+            base_url=self._base_url,
+            http_client=AsyncHttpClient(limits=HTTP_LIMITS),
+            max_retries=0,
+        )
+
+    @functools.cached_property
+    def api_model_name(self):
+        # The "-FC" suffix only selects the function calling mode in this repo.
+        return self.model_name.replace("-FC", "")
+
+    def close(self):
+        self.client.close()
+
+    async def aclose(self):
+        self.close()
+        # Only close the async client if it was ever created.
+        if "async_client" in self.__dict__:
+            await self.async_client.close()
+            del self.async_client
+
+    def _get_functions_str(self, functions, test_category):
+        # This method returns the string of pre-processed functions that is embedded in the prompt of non-FC models.
+        key = (functions_cache_key(functions), test_category, False)
+        functions_str = _FUNCTIONS_CACHE.get(key)
+        if functions_str is None:
+            # Pre-processing mutates the functions in place.
+            functions_str = str(
+                language_specific_pre_processing(
+                    copy.deepcopy(functions), test_category, False
+                )
+            )
+            _FUNCTIONS_CACHE[key] = functions_str
+        return functions_str
+
+    def _get_tools(self, functions, test_category):
+        # This method returns the functions converted to the OpenAI tool format for FC models.
+        key = (functions_cache_key(functions), test_category, self.model_style)
+        oai_tool = _FUNCTIONS_CACHE.get(key)
+        if oai_tool is None:
+            functions = language_specific_pre_processing(
+                copy.deepcopy(functions), test_category, True
+            )
+            if not isinstance(functions, list):
+                functions = [functions]
+            oai_tool = convert_to_tool(
+                functions, GORILLA_TO_OPENAPI, self.model_style, test_category, True
+            )
+            _FUNCTIONS_CACHE[key] = oai_tool
+        return oai_tool
+
+    def _sampling_params(self, num_examples=1):
+        params = {"temperature": self.temperature, "top_p": self.top_p}
+        # A `max_tokens` of 0 leaves the output uncapped.
+        if self.max_tokens:
+            params["max_tokens"] = self.max_tokens * num_examples
+        return params
+
+    def _build_request(self, prompt, functions, test_category):
+        # This method builds the chat completion request shared by `inference` and `ainference`.
         if "FC" not in self.model_name:
             prompt = augment_prompt_by_languge(prompt,test_category)
-            functions = language_specific_pre_processing(functions,test_category,False)
+            functions_str = self._get_functions_str(functions, test_category)
             message = [
                 {
                     "role": "system",
@@ -36,68 +131,152 @@ class OpenAIHandler(BaseHandler):
                     "role": "user",
                     "content": "Questions:"
                     + USER_PROMPT_FOR_CHAT_MODEL.format(
-                        user_prompt=prompt, functions=str(functions)
+                        user_prompt=prompt, functions=functions_str
                     ),
                 },
             ]
-            start_time = time.time()
-            response = self.client.chat.completions.create(
-                messages=message,
-                model=self.model_name,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                top_p=self.top_p,
-            )
-            latency = time.time() - start_time
-            result = response.choices[0].message.content
+            return {
+                "messages": message,
+                "model": self.model_name,
+                **self._sampling_params(),
+            }
         else:
             prompt = augment_prompt_by_languge(prompt, test_category)
-            functions = language_specific_pre_processing(functions, test_category, True)
-            if type(functions) is not list:
-                functions = [functions]
             message = [{"role": "user", "content": "Questions:" + prompt}]
-            oai_tool = convert_to_tool(
-                functions, GORILLA_TO_OPENAPI, self.model_style, test_category, True
-            )
-            start_time = time.time()
+            oai_tool = self._get_tools(functions, test_category)
+            request = {
+                "messages": message,
+                "model": self.api_model_name,
+                **self._sampling_params(),
+            }
             if len(oai_tool) > 0:
-                response = self.client.chat.completions.create(
-                    messages=message,
-                    model=self.model_name.replace("-FC", ""),
-                    temperature=self.temperature,
-                    max_tokens=self.max_tokens,
-                    top_p=self.top_p,
-                    tools=oai_tool,
-                )
-            else:
-                response = self.client.chat.completions.create(
-                    messages=message,
-                    model=self.model_name.replace("-FC", ""),
-                    temperature=self.temperature,
-                    max_tokens=self.max_tokens,
-                    top_p=self.top_p,
-                )
-            latency = time.time() - start_time
+                request["tools"] = oai_tool
+            return request
+
+    def _parse_response(self, response, latency):
+        message = response.choices[0].message
+        usage = response.usage
+        if "FC" not in self.model_name:
+            result = message.content
+        else:
             try:
                 result = [
                     {func_call.function.name: func_call.function.arguments}
-                    for func_call in response.choices[0].message.tool_calls
+                    for func_call in message.tool_calls
                 ]
             except:
-                result = response.choices[0].message.content
+                result = message.content
         metadata = {}
-        metadata["input_tokens"] = response.usage.prompt_tokens
-        metadata["output_tokens"] = response.usage.completion_tokens
+        metadata["input_tokens"] = usage.prompt_tokens
+        metadata["output_tokens"] = usage.completion_tokens
         metadata["latency"] = latency
         return result,metadata
+
+    def inference(self, prompt,functions,test_category):
+        request = self._build_request(prompt, functions, test_category)
+        start_time = time.time()
+        response = self.client.chat.completions.create(**request)
+        latency = time.time() - start_time
+        return self._parse_response(response, latency)
+
+    async def ainference(self, prompt, functions, test_category):
+        # The request is built in a worker thread so that it does not hold up the event loop.
+        request = await asyncio.to_thread(
+            self._build_request, prompt, functions, test_category
+        )
+        start_time = time.time()
+        response = await self.async_client.chat.completions.create(**request)
+        latency = time.time() - start_time
+        return self._parse_response(response, latency)
     
+    def _build_batch_request(self, prompts, functions_list, test_category):
+        # This method builds a single chat completion request that asks for the answers of all the test cases at once.
+        examples = []
+        for i, (prompt, functions) in enumerate(zip(prompts, functions_list)):
+            prompt = augment_prompt_by_languge(prompt, test_category)
+            functions_str = self._get_functions_str(functions, test_category)
+            examples.append(
+                f"<example id=\"{i + 1}\">\n"
+                + USER_PROMPT_FOR_BATCHED_EXAMPLE.format(
+                    user_prompt=prompt, functions=functions_str
+                )
+                + "</example>"
+            )
+        message = [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT_FOR_CHAT_MODEL,
+            },
+            {
+                "role": "user",
+                "content": "<examples>\n"
+                + "\n".join(examples)
+                + "\n</examples>\n"
+                + USER_PROMPT_FOR_BATCHED_CHAT_MODEL.format(num_examples=len(prompts)),
+            },
+        ]
+        return {
+            "messages": message,
+            "model": self.model_name,
+            **self._sampling_params(num_examples=len(prompts)),
+        }
+
+    def _parse_batch_response(self, response, latency, num_examples):
+        # Returns None if the model did not answer with one string per test case.
+        try:
+            answers = json.loads(
+                _CODE_FENCE.sub("", response.choices[0].message.content.strip())
+            )
+        except (json.JSONDecodeError, AttributeError):
+            return None
+        if not isinstance(answers, list) or len(answers) != num_examples:
+            return None
+        answers = [answer if isinstance(answer, str) else str(answer) for answer in answers]
+        # The usage of the request is split across the test cases, the completion tokens in proportion to the answers.
+        total_length = sum(len(answer) for answer in answers) or 1
+        usage = response.usage
+        batch_result = []
+        for answer in answers:
+            metadata = {}
+            metadata["input_tokens"] = usage.prompt_tokens / num_examples
+            metadata["output_tokens"] = (
+                usage.completion_tokens * len(answer) / total_length
+            )
+            metadata["latency"] = latency / num_examples
+            batch_result.append((answer, metadata))
+        return batch_result
+
+    def supports_batching(self):
+        # Tool calls do not batch cleanly, so FC models send one request per test case.
+        return "FC" not in self.model_name
+
+    def batch_inference(self, prompts, functions_list, test_category):
+        if not self.supports_batching():
+            return super().batch_inference(prompts, functions_list, test_category)
+        request = self._build_batch_request(prompts, functions_list, test_category)
+        start_time = time.time()
+        response = self.client.chat.completions.create(**request)
+        latency = time.time() - start_time
+        return self._parse_batch_response(response, latency, len(prompts))
+
+    async def abatch_inference(self, prompts, functions_list, test_category):
+        if not self.supports_batching():
+            return await super().abatch_inference(prompts, functions_list, test_category)
+        request = await asyncio.to_thread(
+            self._build_batch_request, prompts, functions_list, test_category
+        )
+        start_time = time.time()
+        response = await self.async_client.chat.completions.create(**request)
+        latency = time.time() - start_time
+        return self._parse_batch_response(response, latency, len(prompts))
+
     def decode_ast(self,result,language="Python"):
         if "FC" not in self.model_name:
             decoded_output = ast_parse(result,language)
         else:
             decoded_output = []
             for invoked_function in result:
-                name = list(invoked_function.keys())[0]
+                name = next(iter(invoked_function))
                 params = json.loads(invoked_function[name])
                 if language == "Python":
                     pass
@@ -1,5 +1,5 @@
 from model_handler.model_style import ModelStyle
-import json, os
+import asyncio, json, os
 
 
 class BaseHandler:
@@ -16,6 +16,30 @@ class BaseHandler:
         # This method is used to retrive model response for each model.
         pass
 
+    async def ainference(self, prompt, functions, test_category):
+        # This method is the asynchronous version of `inference`, used by the evaluation loop to run multiple requests concurrently.
+        # By default, the blocking `inference` is run in a worker thread. Handlers with an async client should override it.
+        return await asyncio.to_thread(self.inference, prompt, functions, test_category)
+
+    def supports_batching(self):
+        # This method tells whether `batch_inference` answers multiple test cases with a single request.
+        return False
+
+    def batch_inference(self, prompts, functions_list, test_category):
+        # This method is used to retrive model responses for multiple test cases at once, returning one (result, metadata) pair per test case.
+        # By default, each test case is sent in its own request. Handlers that override it to use a single request also override `supports_batching`,
+        # and return None when the model does not answer in the batched format, so that the caller sends the test cases one by one.
+        return [
+            self.inference(prompt, functions, test_category)
+            for prompt, functions in zip(prompts, functions_list)
+        ]
+
+    async def abatch_inference(self, prompts, functions_list, test_category):
+        # This method is the asynchronous version of `batch_inference`.
+        return await asyncio.to_thread(
+            self.batch_inference, prompts, functions_list, test_category
+        )
+
     def decode_ast(self, result, language="Python"):
         # This method takes raw model output and convert it to standard AST checker input.
         pass
@@ -24,20 +48,34 @@ class BaseHandler:
         # This method takes raw model output and convert it to standard execute checker input.
         pass
 
-    def write(self, result, file_to_open):
-        # This method is used to write the result to the file.
-        if not os.path.exists("./result"):
-            os.mkdir("./result")
-        if not os.path.exists("./result/" + self.model_name):
-            os.mkdir("./result/" + self.model_name)
-        with open(
+    def close(self):
+        # This method is used to release the resources held by the handler, such as HTTP connection pools.
+        pass
+
+    async def aclose(self):
+        # This method is the asynchronous version of `close`, for handlers that also hold async resources.
+        self.close()
+
+    def get_result_path(self, file_to_open):
+        # This method returns the path of the result file for the given test file.
+        return (
             "./result/"
             + self.model_name
             + "/"
-            + file_to_open.replace(".json", "_result.json"),
-            "a+",
-        ) as f:
-            f.write(json.dumps(result) + "\n")
+            + file_to_open.replace(".json", "_result.json")
+        )
+
+    def write(self, result, file_to_open):
+        # This method is used to write the result to the file.
+        self.write_batch([result], file_to_open)
+
+    def write_batch(self, results, file_to_open):
+        # This method is used to write several results to the file with a single open.
+        result_path = self.get_result_path(file_to_open)
+        os.makedirs(os.path.dirname(result_path), exist_ok=True)
+        with open(result_path, "a") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
 
     def load_result(self, test_category):
         # This method is used to load the result from the file.
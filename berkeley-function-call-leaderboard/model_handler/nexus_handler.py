@@ -40,11 +40,11 @@ class NexusHandler(BaseHandler):
             raven_prompt += func_desc + "\n\n"
             raven_prompt += "Args:" + "\n"
             for param in params:
-                if "type" not in params[param].keys():
+                if "type" not in params[param]:
                     param_type = "object"
                 else:
                     param_type = params[param]["type"]
-                if "description" not in params[param].keys():
+                if "description" not in params[param]:
                     param_desc = ""
                 else:
                     param_desc = params[param]["description"]
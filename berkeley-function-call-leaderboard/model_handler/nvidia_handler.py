@@ -1,4 +1,4 @@
-import time,os,json
+import time,os
 from openai import OpenAI
 from model_handler.handler import BaseHandler
 from model_handler.model_style import ModelStyle
@@ -53,12 +53,5 @@ class NvidiaHandler(BaseHandler):
         metadata = {"input_tokens": input_token, "output_tokens": output_token, "latency": latency}
         return result, metadata
     
-    def write(self, result, file_to_open):
-        if not os.path.exists("./result"):
-            os.mkdir("./result")
-        if not os.path.exists("./result/" + self.model_name.replace("/", "_")):
-            os.mkdir("./result/" + self.model_name.replace("/", "_"))
-        with open(
-            "./result/" + self.model_name.replace("/", "_") + "/" + file_to_open.replace(".json", "_result.json"), "a+"
-        ) as f:
-            f.write(json.dumps(result) + "\n")
+    def get_result_path(self, file_to_open):
+        return "./result/" + self.model_name.replace("/", "_") + "/" + file_to_open.replace(".json", "_result.json")
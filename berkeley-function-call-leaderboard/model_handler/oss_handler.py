@@ -1,6 +1,6 @@
 import json
-import os
 
+import orjson
 import ray
 import shortuuid
 import torch
@@ -88,9 +88,9 @@ class OSSHandler(BaseHandler):
     ):
 
         ques_jsons = []
-        with open(question_file, "r") as ques_file:
+        with open(question_file, "rb") as ques_file:
             for line in ques_file:
-                ques_jsons.append(json.loads(line))
+                ques_jsons.append(orjson.loads(line))
 
         chunk_size = len(ques_jsons) // num_gpus
         ans_handles = []
@@ -127,21 +127,14 @@ class OSSHandler(BaseHandler):
     def decode_execute(self, result):
         return result
 
-    def write(self, result, file_to_open):
-        if not os.path.exists("./result"):
-            os.mkdir("./result")
-        if not os.path.exists("./result/" + self.model_name.replace("/", "_")):
-            os.mkdir("./result/" + self.model_name.replace("/", "_"))
-        with open(
-            "./result/" + self.model_name.replace("/", "_") + "/" + file_to_open, "a+"
-        ) as f:
-            f.write(json.dumps(result) + "\n")
+    def get_result_path(self, file_to_open):
+        return "./result/" + self.model_name.replace("/", "_") + "/" + file_to_open
 
     def load_result(self, test_category):
         eval_data = []
-        with open("./eval_data_total.json") as f:
+        with open("./eval_data_total.json", "rb") as f:
             for line in f:
-                eval_data.append(json.loads(line))
+                eval_data.append(orjson.loads(line))
         result_list = []
         idx = 0
         with open(f"./result/{self.model_name}/result.json") as f:
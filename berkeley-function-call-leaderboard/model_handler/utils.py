@@ -1,4 +1,4 @@
-import re, ast, builtins, ast, json
+import re, ast, builtins, ast, json, operator, orjson
 from model_handler.model_style import ModelStyle
 from model_handler.constant import JAVA_TYPE_CONVERSION, JS_TYPE_CONVERSION
 from model_handler.java_parser import parse_java_function_call
@@ -53,40 +53,66 @@ def _cast_to_openai_type(properties, mapping, test_category):
     return properties
 
 
+# Groups of model styles that share a conversion step in `convert_to_tool`, built once instead of on every function.
+_STYLES_WITHOUT_DOT_IN_NAME = frozenset(
+    [
+        ModelStyle.OpenAI,
+        ModelStyle.Mistral,
+        ModelStyle.Google,
+        ModelStyle.OSSMODEL,
+        ModelStyle.Anthropic_FC,
+        ModelStyle.COHERE,
+    ]
+)
+_STYLES_WITH_STRINGIFIED_PARAMETERS = frozenset(
+    [
+        ModelStyle.OpenAI,
+        ModelStyle.Mistral,
+        ModelStyle.Google,
+        ModelStyle.Anthropic_Prompt,
+        ModelStyle.Anthropic_FC,
+        ModelStyle.FIREWORK_AI,
+        ModelStyle.OSSMODEL,
+        ModelStyle.COHERE,
+    ]
+)
+_STYLES_WITH_PLAIN_TOOL = frozenset(
+    [
+        ModelStyle.Anthropic_Prompt,
+        ModelStyle.Google,
+        ModelStyle.OSSMODEL,
+    ]
+)
+_STYLES_WITH_FUNCTION_TOOL = frozenset(
+    [
+        ModelStyle.OpenAI,
+        ModelStyle.Mistral,
+        ModelStyle.FIREWORK_AI,
+    ]
+)
+
+
+def functions_cache_key(functions):
+    # This method returns the key under which the handlers cache the tools and prompts built from `functions`.
+    # The serialized bytes are used as the key directly: the dict already hashes them, and a cryptographic digest on top would cost more than the lookup it guards.
+    # Keys are not sorted, because the cached values keep the key order of the functions (`str(functions)` for instance).
+    return orjson.dumps(functions, default=str)
+
+
 def convert_to_tool(
     functions, mapping, model_style, test_category, stringify_parameters=False
 ):
     oai_tool = []
     for item in functions:
-        if "." in item["name"] and (
-            model_style == ModelStyle.OpenAI
-            or model_style == ModelStyle.Mistral
-            or model_style == ModelStyle.Google
-            or model_style == ModelStyle.OSSMODEL
-            or model_style == ModelStyle.Anthropic_FC
-            or model_style == ModelStyle.COHERE
-        ):
+        if "." in item["name"] and model_style in _STYLES_WITHOUT_DOT_IN_NAME:
             # OAI does not support "." in the function name so we replace it with "_". ^[a-zA-Z0-9_-]{1,64}$ is the regex for the name.
-            item["name"] = re.sub(r"\.", "_", item["name"])
+            item["name"] = item["name"].replace(".", "_")
         item["parameters"]["type"] = "object"
         item["parameters"]["properties"] = _cast_to_openai_type(
             item["parameters"]["properties"], mapping, test_category
         )
         # When Java and Javascript, for OpenAPI compatible models, let it become string.
-        if (
-            model_style
-            in [
-                ModelStyle.OpenAI,
-                ModelStyle.Mistral,
-                ModelStyle.Google,
-                ModelStyle.Anthropic_Prompt,
-                ModelStyle.Anthropic_FC,
-                ModelStyle.FIREWORK_AI,
-                ModelStyle.OSSMODEL,
-                ModelStyle.COHERE,
-            ]
-            and stringify_parameters
-        ):
+        if model_style in _STYLES_WITH_STRINGIFIED_PARAMETERS and stringify_parameters:
             properties = item["parameters"]["properties"]
             if test_category == "java":
                 for key, value in properties.items():
@@ -181,11 +207,7 @@ def convert_to_tool(
                     if "properties" in params:
                         params["description"] += " Dictionary properties: " + str(params["properties"])
                         del params["properties"]
-        if model_style in [
-            ModelStyle.Anthropic_Prompt,
-            ModelStyle.Google,
-            ModelStyle.OSSMODEL,
-        ]:
+        if model_style in _STYLES_WITH_PLAIN_TOOL:
             oai_tool.append(item)
         elif model_style == ModelStyle.COHERE:
             parameter = item["parameters"]["properties"]
@@ -204,17 +226,13 @@ def convert_to_tool(
                     "parameter_definitions": parameter_definitions,
                 }
             )
-        elif model_style in [
-            ModelStyle.OpenAI,
-            ModelStyle.Mistral,
-            ModelStyle.FIREWORK_AI,
-        ]:
+        elif model_style in _STYLES_WITH_FUNCTION_TOOL:
             oai_tool.append({"type": "function", "function": item})
     return oai_tool
 
 
 def convert_to_function_call(function_call_list):
-    if type(function_call_list) == dict:
+    if isinstance(function_call_list, dict):
         function_call_list = [function_call_list]
     execution_list = []
     for function_call in function_call_list:
@@ -285,6 +303,34 @@ def resolve_ast_call(elem):
     return {func_name: args_dict}
 
 
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.MatMult: operator.matmul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.LShift: operator.lshift,
+    ast.RShift: operator.rshift,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+    ast.BitAnd: operator.and_,
+}
+
+
+def evaluate_binary_operation(value):
+    # This method evaluates an expression such as `2 * 3` or `10 ** 6` in the model output.
+    # Only literal operands are allowed, so arbitrary code in the model output is never executed, and no code is compiled.
+    if isinstance(value, ast.BinOp):
+        return _BINARY_OPERATORS[type(value.op)](
+            evaluate_binary_operation(value.left),
+            evaluate_binary_operation(value.right),
+        )
+    return ast.literal_eval(value)
+
+
 def resolve_ast_by_type(value):
     if isinstance(value, ast.Constant):
         if value.value is Ellipsis:
@@ -307,7 +353,7 @@ def resolve_ast_by_type(value):
     elif isinstance(
         value, ast.BinOp
     ):  # Added this condition to handle function calls as arguments
-        output = eval(ast.unparse(value))
+        output = evaluate_binary_operation(value)
     elif isinstance(value, ast.Name):
         output = value.id
     elif isinstance(value, ast.Call):
@@ -342,7 +388,7 @@ def augment_prompt_by_languge(prompt, test_category):
 
 
 def language_specific_pre_processing(function, test_category, string_param):
-    if type(function) is dict:
+    if isinstance(function, dict):
         function = [function]
     if len(function) == 0:
        return function
@@ -374,35 +420,37 @@ def language_specific_pre_processing(function, test_category, string_param):
         return function
 
 
+# Only the <tools> block of the tool use system prompt depends on the test case.
+TOOL_USE_SYSTEM_PROMPT_PREFIX = (
+    "In this environment you have access to a set of tools you can use to answer the user's question.\n"
+    "\n"
+    "You may call them like this:\n"
+    "<function_calls>\n"
+    "<invoke>\n"
+    "<tool_name>$TOOL_NAME</tool_name>\n"
+    "<parameters>\n"
+    "<$PARAMETER_NAME>$PARAMETER_VALUE</$PARAMETER_NAME>\n"
+    "...\n"
+    "</parameters>\n"
+    "</invoke>\n"
+    "</function_calls>\n"
+    "\n"
+    "Here are the tools available:\n"
+    "<tools>\n"
+)
+TOOL_USE_SYSTEM_PROMPT_SUFFIX = "\n</tools>"
+
+
 def construct_tool_use_system_prompt(tools):
-    tool_use_system_prompt = (
-        "In this environment you have access to a set of tools you can use to answer the user's question.\n"
-        "\n"
-        "You may call them like this:\n"
-        "<function_calls>\n"
-        "<invoke>\n"
-        "<tool_name>$TOOL_NAME</tool_name>\n"
-        "<parameters>\n"
-        "<$PARAMETER_NAME>$PARAMETER_VALUE</$PARAMETER_NAME>\n"
-        "...\n"
-        "</parameters>\n"
-        "</invoke>\n"
-        "</function_calls>\n"
-        "\n"
-        "Here are the tools available:\n"
-        "<tools>\n"
-        + "\n".join(
-            [
-                construct_format_tool_for_claude_prompt(
-                    tool["name"], tool["description"], tool["parameters"]["properties"]
-                )
-                for tool in tools
-            ]
-        )
-        + "\n</tools>"
+    tools_prompt = "\n".join(
+        [
+            construct_format_tool_for_claude_prompt(
+                tool["name"], tool["description"], tool["parameters"]["properties"]
+            )
+            for tool in tools
+        ]
     )
-
-    return tool_use_system_prompt
+    return TOOL_USE_SYSTEM_PROMPT_PREFIX + tools_prompt + TOOL_USE_SYSTEM_PROMPT_SUFFIX
 
 
 def construct_format_tool_for_claude_prompt(name, description, parameters):
@@ -422,7 +470,8 @@ def construct_format_tool_for_claude_prompt(name, description, parameters):
 
 
 def construct_format_parameters_prompt(parameters):
-    constructed_prompt = ""
+    # The parameter blocks are collected and joined once, rather than growing the prompt string one block at a time.
+    parameter_prompts = []
     for parameter_name, parameter in parameters.items():
         if parameter_name == "required":
             continue
@@ -439,29 +488,39 @@ def construct_format_parameters_prompt(parameters):
                 f"\n Dictionaries properties: {str(parameter['properties'])}"
             )
         if "description" in parameter:
-            constructed_prompt += f"<parameter>\n<name>{parameter_name}</name>\n<type>{parameter['type']}</type>\n<description>{description_string}</description>\n</parameter>\n"
+            parameter_prompts.append(
+                f"<parameter>\n<name>{parameter_name}</name>\n<type>{parameter['type']}</type>\n<description>{description_string}</description>\n</parameter>"
+            )
         else:
-            constructed_prompt += f"<parameter>\n<name>{parameter_name}</name>\n<type>{parameter['type']}</type>\n</parameter>\n"
-    constructed_prompt = constructed_prompt[:-1]
-    return constructed_prompt
+            parameter_prompts.append(
+                f"<parameter>\n<name>{parameter_name}</name>\n<type>{parameter['type']}</type>\n</parameter>"
+            )
+    return "\n".join(parameter_prompts)
+
+
+# Patterns used to parse the <function_calls> XML of prompt-based function calling, compiled once at import.
+_FUNCTION_CALL_TAGS_REGEX = re.compile(
+    r"<function_calls>|</function_calls>|<invoke>|</invoke>|<tool_name>|</tool_name>|<parameters>|</parameters>",
+    re.DOTALL,
+)
+_FUNCTION_CALLS_REGEX = re.compile(r"<function_calls>(.*)</function_calls>", re.DOTALL)
+_FUNCTION_CALLS_PREFIX_REGEX = re.compile(r"^(.*?)<function_calls>", re.DOTALL)
+_INVOKE_REGEX = re.compile(r"<invoke>.*?</invoke>", re.DOTALL)
+_TOOL_NAME_REGEX = re.compile(r"<tool_name>.*?</tool_name>", re.DOTALL)
+_PARAMETERS_REGEX = re.compile(r"<parameters>.*?</parameters>", re.DOTALL)
+_TAG_REGEX = re.compile(r"<.*?>", re.DOTALL)
 
 
 def _function_calls_valid_format_and_invoke_extraction(last_completion):
     """Check if the function call follows a valid format and extract the attempted function calls if so. Does not check if the tools actually exist or if they are called with the requisite params."""
 
     # Check if there are any of the relevant XML tags present that would indicate an attempted function call.
-    function_call_tags = re.findall(
-        r"<function_calls>|</function_calls>|<invoke>|</invoke>|<tool_name>|</tool_name>|<parameters>|</parameters>",
-        last_completion,
-        re.DOTALL,
-    )
+    function_call_tags = _FUNCTION_CALL_TAGS_REGEX.findall(last_completion)
     if not function_call_tags:
         return {"status": True, "invokes": []}
 
     # Extract content between <function_calls> tags. If there are multiple we will only parse the first and ignore the rest, regardless of their correctness.
-    match = re.search(
-        r"<function_calls>(.*)</function_calls>", last_completion, re.DOTALL
-    )
+    match = _FUNCTION_CALLS_REGEX.search(last_completion)
     if not match:
         return {
             "status": False,
@@ -470,23 +529,22 @@ def _function_calls_valid_format_and_invoke_extraction(last_completion):
 
     func_calls = match.group(1)
 
-    prefix_match = re.search(r"^(.*?)<function_calls>", last_completion, re.DOTALL)
+    prefix_match = _FUNCTION_CALLS_PREFIX_REGEX.search(last_completion)
     if prefix_match:
         func_call_prefix_content = prefix_match.group(1)
 
     # Check for invoke tags
-    invoke_regex = r"<invoke>.*?</invoke>"
-    if not re.search(invoke_regex, func_calls, re.DOTALL):
+    if not _INVOKE_REGEX.search(func_calls):
         return {
             "status": False,
             "reason": "Missing <invoke></invoke> tags inside of <function_calls></function_calls> tags.",
         }
 
     # Check each invoke contains tool name and parameters
-    invoke_strings = re.findall(invoke_regex, func_calls, re.DOTALL)
+    invoke_strings = _INVOKE_REGEX.findall(func_calls)
     invokes = []
     for invoke_string in invoke_strings:
-        tool_name = re.findall(r"<tool_name>.*?</tool_name>", invoke_string, re.DOTALL)
+        tool_name = _TOOL_NAME_REGEX.findall(invoke_string)
         if not tool_name:
             return {
                 "status": False,
@@ -498,9 +556,7 @@ def _function_calls_valid_format_and_invoke_extraction(last_completion):
                 "reason": "More than one tool_name specified inside single set of <invoke></invoke> tags.",
             }
 
-        parameters = re.findall(
-            r"<parameters>.*?</parameters>", invoke_string, re.DOTALL
-        )
+        parameters = _PARAMETERS_REGEX.findall(invoke_string)
         if not parameters:
             return {
                 "status": False,
@@ -513,10 +569,8 @@ def _function_calls_valid_format_and_invoke_extraction(last_completion):
             }
 
         # Check for balanced tags inside parameters
-        tags = re.findall(
-            r"<.*?>",
-            parameters[0].replace("<parameters>", "").replace("</parameters>", ""),
-            re.DOTALL,
+        tags = _TAG_REGEX.findall(
+            parameters[0].replace("<parameters>", "").replace("</parameters>", "")
         )
         if len(tags) % 2 != 0:
             return {
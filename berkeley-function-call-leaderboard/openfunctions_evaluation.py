@@ -1,9 +1,16 @@
-import argparse, json, os
+import argparse, asyncio, copy, json, openai, orjson, os, random, requests, time
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 from model_handler.handler_map import handler_map
 from model_handler.model_style import ModelStyle
 from model_handler.constant import USE_COHERE_OPTIMIZATION
 
+# uvloop is optional and not available on Windows.
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 
 def get_args():
     parser = argparse.ArgumentParser()
@@ -15,9 +22,17 @@ def get_args():
     # Parameters for the model that you want to test.
     parser.add_argument("--temperature", type=float, default=0.7)
     parser.add_argument("--top-p", type=float, default=1)
+    # For GPT models and OpenAI-compatible endpoints, 0 sends no output length cap.
     parser.add_argument("--max-tokens", type=int, default=1200)
     parser.add_argument("--num-gpus", default=1, type=int)
     parser.add_argument("--timeout", default=60, type=int)
+    # Maximum number of requests in flight at the same time for API models.
+    parser.add_argument("--num-workers", default=1, type=int)
+    # Rate limits of the API endpoint; unset means no limit.
+    parser.add_argument("--max-requests-per-minute", default=None, type=float)
+    parser.add_argument("--max-tokens-per-minute", default=None, type=float)
+    # Number of test cases sent in a single request, for handlers that support batching.
+    parser.add_argument("--batch-size", default=1, type=int)
 
     args = parser.parse_args()
     return args
@@ -55,6 +70,370 @@ def load_file(test_category):
     return test_cate, files_to_open
 
 
+# Suffix of the file recording the progress of a result file.
+PROGRESS_FILE_SUFFIX = ".progress"
+
+# Maximum number of results appended to the result file with a single open.
+WRITE_BATCH_SIZE = 32
+
+# Number of attempts for a request that fails with a transient error, with exponential backoff and jitter.
+MAX_ATTEMPTS = 5
+
+
+class RateLimiter:
+    # Token-bucket rate limiter, adapted from the api_request_parallel_processor example in the openai-cookbook.
+    def __init__(self, max_requests_per_minute=None, max_tokens_per_minute=None):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.available_request_capacity = max_requests_per_minute
+        self.available_token_capacity = max_tokens_per_minute
+        self.last_update_time = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        current_time = time.monotonic()
+        seconds_since_update = current_time - self.last_update_time
+        self.last_update_time = current_time
+        if self.max_requests_per_minute is not None:
+            self.available_request_capacity = min(
+                self.available_request_capacity
+                + self.max_requests_per_minute * seconds_since_update / 60,
+                self.max_requests_per_minute,
+            )
+        if self.max_tokens_per_minute is not None:
+            self.available_token_capacity = min(
+                self.available_token_capacity
+                + self.max_tokens_per_minute * seconds_since_update / 60,
+                self.max_tokens_per_minute,
+            )
+
+    async def acquire(self, num_tokens):
+        # This method waits until both buckets have enough capacity for the request, then consumes it.
+        if self.max_tokens_per_minute is not None:
+            # A request larger than the whole bucket would otherwise wait forever.
+            num_tokens = min(num_tokens, self.max_tokens_per_minute)
+        async with self.lock:
+            while True:
+                self._refill()
+                delay = 0
+                if self.max_requests_per_minute is not None:
+                    delay = max(
+                        delay,
+                        (1 - self.available_request_capacity)
+                        * 60
+                        / self.max_requests_per_minute,
+                    )
+                if self.max_tokens_per_minute is not None:
+                    delay = max(
+                        delay,
+                        (num_tokens - self.available_token_capacity)
+                        * 60
+                        / self.max_tokens_per_minute,
+                    )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            if self.max_requests_per_minute is not None:
+                self.available_request_capacity -= 1
+            if self.max_tokens_per_minute is not None:
+                self.available_token_capacity -= num_tokens
+
+
+def estimate_num_tokens(prompt, functions, max_tokens):
+    # Rough estimate of the tokens of a request, at ~4 characters per token plus `max_tokens` for the completion.
+    return len(prompt) // 4 + len(str(functions)) // 4 + max_tokens
+
+
+def is_transient_error(error):
+    # Rate limits, server errors, dropped connections and timeouts are worth retrying.
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code == 429 or status_code >= 500
+    return isinstance(
+        error,
+        (
+            openai.APIConnectionError,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+            ConnectionError,
+            TimeoutError,
+        ),
+    )
+
+
+def get_retry_after(error):
+    # Returns the `Retry-After` delay in seconds, or None if it is missing or is an HTTP date.
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return float(headers["retry-after"])
+    except (TypeError, KeyError, ValueError):
+        return None
+
+
+def get_num_existing_result(result_path):
+    # If the result file already exists, skip the test cases that have been tested.
+    if not os.path.exists(result_path):
+        return 0
+    # The progress file is only trusted if the result file has not been modified since it was written.
+    try:
+        with open(result_path + PROGRESS_FILE_SUFFIX) as f:
+            progress = json.load(f)
+        if progress["bytes_written"] == os.path.getsize(result_path):
+            return progress["next_idx"]
+    except (OSError, ValueError, KeyError):
+        pass
+    num_existing_result = 0
+    with open(result_path) as f:
+        for line in f:
+            num_existing_result += 1
+    return num_existing_result
+
+
+def write_progress(result_path, next_idx):
+    # Some handlers write their results somewhere else.
+    if not os.path.exists(result_path):
+        return
+    progress_path = result_path + PROGRESS_FILE_SUFFIX
+    # Write to a temporary file and rename it, so that the progress file is never partial.
+    with open(progress_path + ".tmp", "w") as f:
+        json.dump(
+            {"next_idx": next_idx, "bytes_written": os.path.getsize(result_path)}, f
+        )
+    os.replace(progress_path + ".tmp", progress_path)
+
+
+def stream_test_cases(file_path, num_existing_result):
+    # Yields the (idx, test case) pairs that have not been tested yet, one line at a time.
+    with open(file_path, "rb") as f:
+        for index, line in enumerate(f):
+            if index >= num_existing_result:
+                yield index, orjson.loads(line)
+
+
+def stream_batches(test_cases, batch_size):
+    batch = []
+    for test_case in test_cases:
+        batch.append(test_case)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def generate_results(
+    handler,
+    test_category,
+    file_to_open,
+    result_path,
+    test_cases,
+    num_test_cases,
+    num_existing_result,
+    num_workers,
+    batch_size,
+    rate_limiter,
+    semaphore,
+    progress_bar_position=0,
+):
+    async def inference_helper(batch):
+        indices, prompts, functions_list = [], [], []
+        for index, test_case in batch:
+            user_question, functions = test_case["question"], test_case["function"]
+            if isinstance(functions, (dict, str)):
+                functions = [functions]
+            indices.append(index)
+            prompts.append(user_question)
+            functions_list.append(functions)
+        num_tokens = sum(
+            estimate_num_tokens(prompt, functions, handler.max_tokens)
+            for prompt, functions in zip(prompts, functions_list)
+        )
+        for attempt in range(MAX_ATTEMPTS):
+            # The handlers pre-process the functions in place, so each attempt gets a fresh copy, made off the event loop.
+            attempt_functions_list = await asyncio.to_thread(
+                copy.deepcopy, functions_list
+            )
+            try:
+                async with semaphore:
+                    # Take the capacity right before sending, as in the openai-cookbook.
+                    await rate_limiter.acquire(num_tokens)
+                    if len(batch) == 1:
+                        results = [
+                            await handler.ainference(
+                                prompts[0], attempt_functions_list[0], test_category
+                            )
+                        ]
+                    else:
+                        results = await handler.abatch_inference(
+                            prompts, attempt_functions_list, test_category
+                        )
+                        if results is None:
+                            # The model did not answer in the batched format, so send the test cases one by one.
+                            results = []
+                            for prompt, functions in zip(prompts, attempt_functions_list):
+                                await rate_limiter.acquire(
+                                    estimate_num_tokens(prompt, functions, handler.max_tokens)
+                                )
+                                results.append(
+                                    await handler.ainference(prompt, functions, test_category)
+                                )
+                break
+            except Exception as e:
+                if not is_transient_error(e) or attempt == MAX_ATTEMPTS - 1:
+                    raise
+                delay = get_retry_after(e)
+                if delay is None:
+                    delay = 2**attempt + random.random()
+                print(f"{type(e).__name__} for idx {indices[0]}, retrying in {delay:.1f}s.")
+                # Back off outside the semaphore so that the slot is released for other requests.
+                await asyncio.sleep(delay)
+        return [
+            {
+                "idx": index,
+                "result": result,
+                "input_token_count": metadata["input_tokens"],
+                "output_token_count": metadata["output_tokens"],
+                "latency": metadata["latency"],
+            }
+            for index, (result, metadata) in zip(indices, results)
+        ]
+
+    # A single writer appends the queued results in a worker thread, until it receives `None`.
+    write_queue = asyncio.Queue(maxsize=256)
+
+    async def writer():
+        while True:
+            batch = [await write_queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE and not write_queue.empty():
+                batch.append(write_queue.get_nowait())
+            done = batch[-1] is None
+            if done:
+                batch.pop()
+            if batch:
+                await asyncio.to_thread(handler.write_batch, batch, file_to_open)
+                await asyncio.to_thread(
+                    write_progress, result_path, batch[-1]["idx"] + 1
+                )
+            if done:
+                return
+
+    writer_task = asyncio.create_task(writer())
+
+    # A failed writer stops draining the queue, so the put is raced against it to raise its exception instead of blocking.
+    async def enqueue(item):
+        if writer_task.done():
+            writer_task.result()
+        if not write_queue.full():
+            write_queue.put_nowait(item)
+            return
+        put_task = asyncio.create_task(write_queue.put(item))
+        await asyncio.wait({put_task, writer_task}, return_when=asyncio.FIRST_COMPLETED)
+        if not put_task.done():
+            put_task.cancel()
+            writer_task.result()
+
+    # The checker matches results to test cases by line number, so results are written in idx order.
+    pending_results = {}
+    next_index = num_existing_result
+    # At most `2 * num_workers` batches are in flight, all within `window` test cases of the next result to write.
+    window = 2 * num_workers * batch_size
+    batches = stream_batches(test_cases, batch_size)
+    next_batch = next(batches, None)
+    in_flight = set()
+    try:
+        with tqdm(
+            total=num_test_cases, desc=test_category, position=progress_bar_position
+        ) as progress_bar:
+            while True:
+                while (
+                    next_batch is not None
+                    and len(in_flight) < 2 * num_workers
+                    and next_batch[0][0] < next_index + window
+                ):
+                    in_flight.add(asyncio.create_task(inference_helper(next_batch)))
+                    next_batch = next(batches, None)
+                if not in_flight:
+                    break
+                done, in_flight = await asyncio.wait(
+                    in_flight | {writer_task}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if writer_task in done:
+                    writer_task.result()
+                in_flight.discard(writer_task)
+                # Keep the results of the other completed tasks even if one of them failed.
+                error = None
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    for result_to_write in task.result():
+                        pending_results[result_to_write["idx"]] = result_to_write
+                        progress_bar.update(1)
+                if error is not None:
+                    raise error
+                while next_index in pending_results:
+                    await enqueue(pending_results.pop(next_index))
+                    next_index += 1
+    finally:
+        for task in in_flight:
+            task.cancel()
+        # Flush the completed results even if a request failed, unless the writer itself failed.
+        if not writer_task.done():
+            while next_index in pending_results:
+                await enqueue(pending_results.pop(next_index))
+                next_index += 1
+            await enqueue(None)
+        await writer_task
+
+
+async def main(args, handler):
+    # Blocking handlers run each request in a thread of the default executor, so it must not cap `--num-workers`.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(
+            max_workers=args.num_workers + min(32, (os.cpu_count() or 1) + 4)
+        )
+    )
+    rate_limiter = RateLimiter(args.max_requests_per_minute, args.max_tokens_per_minute)
+    semaphore = asyncio.Semaphore(args.num_workers)
+    test_cate, files_to_open = load_file(args.test_category)
+    result_dir = "./result/" + args.model.replace("/", "_") + "/"
+
+    async def run_category(test_category, file_to_open, position):
+        print("Generating: " + file_to_open)
+        result_path = result_dir + file_to_open.replace(".json", "_result.json")
+        num_existing_result = get_num_existing_result(result_path)
+        with open("./data/" + file_to_open, "rb") as f:
+            num_test_cases = sum(1 for _ in f) - num_existing_result
+        await generate_results(
+            handler,
+            test_category,
+            file_to_open,
+            result_path,
+            stream_test_cases("./data/" + file_to_open, num_existing_result),
+            num_test_cases,
+            num_existing_result,
+            args.num_workers,
+            # Only batch for handlers that answer a batch with a single request.
+            args.batch_size if handler.supports_batching() else 1,
+            rate_limiter,
+            semaphore,
+            position,
+        )
+
+    tasks = [
+        asyncio.create_task(run_category(test_category, file_to_open, position))
+        for position, (test_category, file_to_open) in enumerate(
+            zip(test_cate, files_to_open)
+        )
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await handler.aclose()
+
 if __name__ == "__main__":
     args = get_args()
     if USE_COHERE_OPTIMIZATION and "command-r-plus" in args.model:
@@ -66,45 +445,8 @@ if __name__ == "__main__":
             test_category=args.test_category,
             num_gpus=args.num_gpus,
         )
-        for res in result[0]:
-            handler.write(res, "result.json")
+        handler.write_batch(result[0], "result.json")
     else:
-        test_cate, files_to_open = load_file(args.test_category)
-        for test_category, file_to_open in zip(test_cate, files_to_open):
-            print("Generating: " + file_to_open)
-            test_cases = []
-            with open("./data/" + file_to_open) as f:
-                for line in f:
-                    test_cases.append(json.loads(line))
-            num_existing_result = 0  # if the result file already exists, skip the test cases that have been tested.
-            if os.path.exists(
-                "./result/"
-                + args.model.replace("/", "_")
-                + "/"
-                + file_to_open.replace(".json", "_result.json")
-            ):
-                with open(
-                    "./result/"
-                    + args.model.replace("/", "_")
-                    + "/"
-                    + file_to_open.replace(".json", "_result.json")
-                ) as f:
-                    for line in f:
-                        num_existing_result += 1
-            for index, test_case in enumerate(tqdm(test_cases)):
-                if index < num_existing_result:
-                    continue
-                user_question, functions = test_case["question"], test_case["function"]
-                if type(functions) is dict or type(functions) is str:
-                    functions = [functions]
-                result, metadata = handler.inference(
-                    user_question, functions, test_category
-                )
-                result_to_write = {
-                    "idx": index,
-                    "result": result,
-                    "input_token_count": metadata["input_tokens"],
-                    "output_token_count": metadata["output_tokens"],
-                    "latency": metadata["latency"],
-                }
-                handler.write(result_to_write, file_to_open)
+        if uvloop is not None:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        asyncio.run(main(args, handler))